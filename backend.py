@@ -1,10 +1,15 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
-import json
-import os
-from datetime import datetime
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+from typing import Optional
+from todos_store import store
+from contextlib import asynccontextmanager
+from functools import partial
+import anyio
+import asyncio
+import threading
+import orjson
 
 # Lazy import to avoid startup errors if dependencies are missing
 def get_process_command_function():
@@ -18,7 +23,57 @@ def get_process_command_function():
             "Run: uv sync or pip install langchain langchain-ollama langgraph"
         )
 
-app = FastAPI(title="Todo API")
+# Seconds to wait after a change before writing the todos file, so a burst
+# of changes is written once
+FLUSH_DELAY = 0.05
+
+# Pending debounced flush, if any
+_flush_task: Optional[asyncio.Task] = None
+
+def schedule_flush():
+    """Write the todos file shortly, unless a write is already scheduled"""
+    global _flush_task
+    if _flush_task is None:
+        _flush_task = asyncio.create_task(flush_soon())
+
+async def flush_soon():
+    """Wait for further changes, then write them all in one flush"""
+    global _flush_task
+    await asyncio.sleep(FLUSH_DELAY)
+    # Changes made from here on schedule a new flush
+    _flush_task = None
+    await anyio.to_thread.run_sync(store.flush)
+
+def warm_up_graph():
+    """Build the LangGraph agent and load the Ollama model ahead of the first command"""
+    try:
+        from todo_graph import warmup
+        warmup()
+    except Exception:
+        # The first command will report missing dependencies or Ollama errors
+        pass
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Read the JSON database at startup and write pending changes on shutdown"""
+    store.load()
+    # Warm up in the background so startup and other requests aren't blocked
+    threading.Thread(target=warm_up_graph, daemon=True).start()
+    yield
+    if _flush_task is not None:
+        _flush_task.cancel()
+    store.flush()
+
+class OrjsonResponse(Response):
+    """JSON response encoded with orjson"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+# Responses are built from our own JSON file, so they skip response_model
+# validation and are encoded with orjson
+app = FastAPI(title="Todo API", default_response_class=OrjsonResponse, lifespan=lifespan)
 
 # Enable CORS for Streamlit
 app.add_middleware(
@@ -29,110 +84,91 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# JSON database file - use absolute path based on script location
-DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "todos.json")
-
-class Todo(BaseModel):
-    id: int
-    text: str
-    completed: bool = False
-    created_at: str
-
 class TodoCreate(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
     text: str
 
 class TodoUpdate(BaseModel):
+    model_config = ConfigDict(extra='forbid')
+
     text: Optional[str] = None
     completed: Optional[bool] = None
 
-def load_todos() -> List[dict]:
-    """Load todos from JSON file"""
-    if os.path.exists(DB_FILE):
-        try:
-            with open(DB_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_todos(todos: List[dict]):
-    """Save todos to JSON file"""
-    with open(DB_FILE, 'w') as f:
-        json.dump(todos, f, indent=2)
-
-def get_next_id(todos: List[dict]) -> int:
-    """Get the next available ID"""
-    if not todos:
-        return 1
-    return max(todo.get('id', 0) for todo in todos) + 1
-
 @app.get("/")
 def read_root():
     return {"message": "Todo API is running"}
 
-@app.get("/todos", response_model=List[Todo])
-def get_todos():
-    """Get all todos"""
-    todos = load_todos()
-    return todos
+# Store calls may read the JSON file or wait on a flush in progress, so the
+# async endpoints run them in a worker thread to keep the event loop free
 
-@app.post("/todos", response_model=Todo)
-def create_todo(todo: TodoCreate):
+@app.get("/todos")
+async def get_todos():
+    """Get all todos"""
+    return await anyio.to_thread.run_sync(store.all)
+
+@app.get("/todos/stream")
+async def stream_todos():
+    """Stream all todos as newline-delimited JSON, one todo per line"""
+    todos = await anyio.to_thread.run_sync(store.all)
+    def generate():
+        for todo in todos:
+            yield orjson.dumps(todo) + b"\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.post("/todos")
+async def create_todo(todo: TodoCreate):
     """Create a new todo"""
-    todos = load_todos()
-    new_todo = {
-        "id": get_next_id(todos),
-        "text": todo.text,
-        "completed": False,
-        "created_at": datetime.now().isoformat()
-    }
-    todos.append(new_todo)
-    save_todos(todos)
+    new_todo = await anyio.to_thread.run_sync(store.add, todo.text)
+    schedule_flush()
     return new_todo
 
-@app.get("/todos/{todo_id}", response_model=Todo)
-def get_todo(todo_id: int):
+@app.get("/todos/{todo_id}")
+async def get_todo(todo_id: int):
     """Get a specific todo by ID"""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    todo = await anyio.to_thread.run_sync(store.get, todo_id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     return todo
 
-@app.put("/todos/{todo_id}", response_model=Todo)
-def update_todo(todo_id: int, todo_update: TodoUpdate):
+@app.put("/todos/{todo_id}")
+async def update_todo(todo_id: int, todo_update: TodoUpdate):
     """Update a todo"""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    fields = todo_update.model_dump(exclude_none=True)
+    todo = await anyio.to_thread.run_sync(partial(store.update, todo_id, **fields))
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
-    if todo_update.text is not None:
-        todo['text'] = todo_update.text
-    if todo_update.completed is not None:
-        todo['completed'] = todo_update.completed
-    
-    save_todos(todos)
+    schedule_flush()
     return todo
 
 @app.delete("/todos/{todo_id}")
-def delete_todo(todo_id: int):
+async def delete_todo(todo_id: int):
     """Delete a todo"""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    todo = await anyio.to_thread.run_sync(store.delete, todo_id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     
-    todos = [t for t in todos if t['id'] != todo_id]
-    save_todos(todos)
+    schedule_flush()
     return {"message": "Todo deleted successfully"}
 
 @app.delete("/todos")
-def delete_all_todos():
+async def delete_all_todos():
     """Delete all todos"""
-    save_todos([])
+    await anyio.to_thread.run_sync(store.delete_all)
+    schedule_flush()
     return {"message": "All todos deleted successfully"}
 
+# Action reported to clients for the tool that handled a command
+TOOL_ACTIONS = {
+    "create_todo_tool": "create",
+    "delete_todo_tool": "delete",
+    "delete_all_todos_tool": "delete_all",
+    "update_todo_tool": "update",
+    "complete_todo_tool": "complete",
+    "list_todos_tool": "list",
+}
+
 @app.post("/todos/process-command")
 def process_command(command: str, thread_id: str = "default"):
     """Process natural language command using LangGraph and return action result"""
@@ -148,24 +184,9 @@ def process_command(command: str, thread_id: str = "default"):
         todo_text = None
         
         if result.get("success"):
-            message = result.get("message", "")
-            message_lower = message.lower()
-            
-            # Determine action from result message
-            if "created" in message_lower or "create" in message_lower:
-                action = "create"
-                if "todo" in result:
-                    todo_text = result["todo"].get("text")
-            elif "deleted" in message_lower and "all" in message_lower:
-                action = "delete_all"
-            elif "deleted" in message_lower:
-                action = "delete"
-            elif "updated" in message_lower:
-                action = "update"
-            elif "completed" in message_lower:
-                action = "complete"
-            elif "todos" in result:
-                action = "list"
+            action = TOOL_ACTIONS.get(result.get("tool"))
+            if action == "create" and "todo" in result:
+                todo_text = result["todo"].get("text")
         
         return {
             "action": action,
@@ -185,4 +206,7 @@ def process_command(command: str, thread_id: str = "default"):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Run a single worker, since the todo store lives in this process's memory.
+    # uvicorn uses uvloop and httptools when they are installed (from
+    # uvicorn[standard]). Per-request access logging is turned off.
+    uvicorn.run(app, host="0.0.0.0", port=8000, access_log=False)
@@ -1,10 +1,17 @@
 import streamlit as st
+import json
 import requests
+from requests.adapters import HTTPAdapter
 from typing import List, Dict
 import time
 
 # API base URL
 API_URL = "http://localhost:8000"
+# Request timeouts in seconds (natural language commands wait on the LLM)
+REQUEST_TIMEOUT = 10
+COMMAND_TIMEOUT = 120
+# Resubmitting the same command within this many seconds of it finishing is ignored
+DUPLICATE_COMMAND_WINDOW = 2
 
 # Page config
 st.set_page_config(
@@ -44,12 +51,21 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Shared HTTP session so connections to the API are reused across reruns"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=3)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 def get_todos() -> List[Dict]:
-    """Fetch all todos from API"""
+    """Fetch all todos from API, reading them line by line from the NDJSON stream"""
     try:
-        response = requests.get(f"{API_URL}/todos")
-        if response.status_code == 200:
-            return response.json()
+        with get_session().get(f"{API_URL}/todos/stream", stream=True, timeout=REQUEST_TIMEOUT) as response:
+            if response.status_code == 200:
+                return [json.loads(line) for line in response.iter_lines() if line]
         return []
     except requests.exceptions.ConnectionError:
         st.error("⚠️ Cannot connect to backend API. Please make sure the FastAPI server is running on port 8000.")
@@ -58,13 +74,33 @@ def get_todos() -> List[Dict]:
         st.error(f"Error fetching todos: {str(e)}")
         return []
 
+@st.cache_data(ttl=5, show_spinner=False)
+def get_todos_cached() -> List[Dict]:
+    """Fetch all todos, reusing the last result until a todo is changed"""
+    return get_todos()
+
+def show_error(message: str):
+    """Show an error as a toast, which stays visible across the rerun that follows"""
+    st.toast(f"⚠️ {message}")
+
+def response_error(response: requests.Response) -> str:
+    """Get the error detail from a failed API response"""
+    try:
+        return response.json().get("detail", response.reason)
+    except ValueError:
+        return response.reason
+
 def create_todo(text: str) -> bool:
     """Create a new todo"""
     try:
-        response = requests.post(f"{API_URL}/todos", json={"text": text})
-        return response.status_code == 200
+        response = get_session().post(f"{API_URL}/todos", json={"text": text}, timeout=REQUEST_TIMEOUT)
+        get_todos_cached.clear()
+        if response.status_code != 200:
+            show_error(f"Error creating todo: {response_error(response)}")
+            return False
+        return True
     except Exception as e:
-        st.error(f"Error creating todo: {str(e)}")
+        show_error(f"Error creating todo: {str(e)}")
         return False
 
 def update_todo(todo_id: int, text: str = None, completed: bool = None) -> bool:
@@ -75,44 +111,138 @@ def update_todo(todo_id: int, text: str = None, completed: bool = None) -> bool:
             data["text"] = text
         if completed is not None:
             data["completed"] = completed
-        response = requests.put(f"{API_URL}/todos/{todo_id}", json=data)
-        return response.status_code == 200
+        response = get_session().put(f"{API_URL}/todos/{todo_id}", json=data, timeout=REQUEST_TIMEOUT)
+        get_todos_cached.clear()
+        if response.status_code != 200:
+            show_error(f"Error updating todo: {response_error(response)}")
+            return False
+        return True
     except Exception as e:
-        st.error(f"Error updating todo: {str(e)}")
+        show_error(f"Error updating todo: {str(e)}")
         return False
 
 def delete_todo(todo_id: int) -> bool:
     """Delete a todo"""
     try:
-        response = requests.delete(f"{API_URL}/todos/{todo_id}")
-        return response.status_code == 200
+        response = get_session().delete(f"{API_URL}/todos/{todo_id}", timeout=REQUEST_TIMEOUT)
+        get_todos_cached.clear()
+        if response.status_code != 200:
+            show_error(f"Error deleting todo: {response_error(response)}")
+            return False
+        return True
     except Exception as e:
-        st.error(f"Error deleting todo: {str(e)}")
+        show_error(f"Error deleting todo: {str(e)}")
         return False
 
 def delete_all_todos() -> bool:
     """Delete all todos"""
     try:
-        response = requests.delete(f"{API_URL}/todos")
-        return response.status_code == 200
+        response = get_session().delete(f"{API_URL}/todos", timeout=REQUEST_TIMEOUT)
+        get_todos_cached.clear()
+        if response.status_code != 200:
+            show_error(f"Error deleting all todos: {response_error(response)}")
+            return False
+        return True
     except Exception as e:
-        st.error(f"Error deleting all todos: {str(e)}")
+        show_error(f"Error deleting all todos: {str(e)}")
         return False
 
 def process_command(command: str, thread_id: str = "default") -> Dict:
     """Process natural language command using LangGraph"""
     try:
-        response = requests.post(
+        response = get_session().post(
             f"{API_URL}/todos/process-command",
-            params={"command": command, "thread_id": thread_id}
+            params={"command": command, "thread_id": thread_id},
+            timeout=COMMAND_TIMEOUT
         )
+        # The command may have changed todos through the agent's tools
+        get_todos_cached.clear()
         if response.status_code == 200:
             return response.json()
+        show_error(f"Error processing command: {response_error(response)}")
         return None
     except Exception as e:
-        st.error(f"Error processing command: {str(e)}")
+        show_error(f"Error processing command: {str(e)}")
         return None
 
+@st.fragment
+def render_todo(todo: Dict):
+    """Render a single todo; its buttons only rerun this todo's fragment.
+
+    Successful changes are applied to the local todo dict, and the whole page
+    is only rerun (refetching todos) when a change fails.
+    """
+    if todo.get('deleted'):
+        return
+    
+    todo_id = todo['id']
+    todo_text = todo['text']
+    completed = todo.get('completed', False)
+    
+    # Create columns for todo display
+    col1, col2, col3, col4 = st.columns([6, 1, 1, 1])
+    
+    with col1:
+        status_icon = "✅" if completed else "⏳"
+        status_class = "todo-completed" if completed else ""
+        st.markdown(f"""
+            <div class="todo-item {status_class}">
+                <strong>{status_icon} Todo #{todo_id}:</strong> {todo_text}
+            </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        if not completed:
+            if st.button("✓", key=f"complete_{todo_id}", help="Mark as complete"):
+                if update_todo(todo_id, completed=True):
+                    todo['completed'] = True
+                    st.toast("Completed!")
+                    st.rerun(scope="fragment")
+                st.rerun()
+        else:
+            if st.button("↩", key=f"uncomplete_{todo_id}", help="Mark as incomplete"):
+                if update_todo(todo_id, completed=False):
+                    todo['completed'] = False
+                    st.toast("Marked as incomplete!")
+                    st.rerun(scope="fragment")
+                st.rerun()
+    
+    with col3:
+        if st.button("✏️", key=f"edit_{todo_id}", help="Edit"):
+            st.session_state[f"editing_{todo_id}"] = True
+    
+    with col4:
+        if st.button("🗑️", key=f"delete_{todo_id}", help="Delete"):
+            if delete_todo(todo_id):
+                todo['deleted'] = True
+                st.toast("Deleted!")
+                st.rerun(scope="fragment")
+            st.rerun()
+    
+    # Edit form
+    if st.session_state.get(f"editing_{todo_id}", False):
+        with st.form(key=f"edit_form_{todo_id}"):
+            new_text = st.text_input("Edit todo", value=todo_text, key=f"edit_input_{todo_id}")
+            col_submit, col_cancel = st.columns(2)
+            with col_submit:
+                submit_edit = st.form_submit_button("Save")
+            with col_cancel:
+                cancel_edit = st.form_submit_button("Cancel")
+            
+            if submit_edit and new_text:
+                if update_todo(todo_id, text=new_text):
+                    todo['text'] = new_text
+                    st.session_state[f"editing_{todo_id}"] = False
+                    st.toast("Updated!")
+                    st.rerun(scope="fragment")
+                st.rerun()
+            
+            if cancel_edit:
+                st.session_state[f"editing_{todo_id}"] = False
+                st.rerun(scope="fragment")
+    
+    st.markdown("<br>", unsafe_allow_html=True)
+
 def main():
     st.markdown('<div class="todo-header">Todo App</div>', unsafe_allow_html=True)
     
@@ -135,9 +265,20 @@ def main():
     with col2:
         submit_button = st.button("Execute", type="primary", use_container_width=True)
     
-    # Process command
-    if submit_button and prompt:
+    # Process command, ignoring an accidental double submit of the same command
+    last_command = st.session_state.get("last_command")
+    is_duplicate = (
+        last_command is not None
+        and last_command[0] == prompt
+        and time.monotonic() - last_command[1] < DUPLICATE_COMMAND_WINDOW
+    )
+    if submit_button and prompt and is_duplicate:
+        st.toast("Command already submitted")
+    elif submit_button and prompt:
         result = process_command(prompt)
+        # Start the window once the command has finished, since a second click
+        # during a slow command is only handled after the first one returns
+        st.session_state.last_command = (prompt, time.monotonic())
         
         if result:
             graph_result = result.get("result", {})
@@ -147,31 +288,36 @@ def main():
             if success:
                 # Show success message from LangGraph
                 if "Created" in message or "created" in message:
-                    st.success(f"✅ {message}")
+                    st.toast(f"✅ {message}")
                 elif "Deleted" in message or "deleted" in message:
-                    st.success(f"🗑️ {message}")
+                    st.toast(f"🗑️ {message}")
                 elif "Updated" in message or "updated" in message:
-                    st.success(f"✏️ {message}")
+                    st.toast(f"✏️ {message}")
                 elif "completed" in message.lower():
-                    st.success(f"✅ {message}")
+                    st.toast(f"✅ {message}")
                 elif "todos" in graph_result:
                     # List action - show todos
                     todos_list = graph_result.get("todos", [])
-                    st.info(f"📋 Found {len(todos_list)} todos")
+                    st.toast(f"📋 Found {len(todos_list)} todos")
                 else:
-                    st.success(f"✅ {message}")
+                    st.toast(f"✅ {message}")
+                # Tools return the todo list after their change, so render
+                # it directly instead of fetching it again
+                if "todos" in graph_result:
+                    st.session_state.todos = graph_result["todos"]
                 st.session_state.refresh = True
             else:
-                st.warning(f"⚠️ {message}")
+                st.toast(f"⚠️ {message}")
         
-        time.sleep(0.5)
         st.rerun()
     
     # Display todos
     st.markdown("---")
     st.markdown("### 📋 Your Todos")
     
-    todos = get_todos()
+    todos = st.session_state.pop("todos", None)
+    if todos is None:
+        todos = get_todos_cached()
     
     if not todos:
         st.info("No todos yet. Add one using the command field above!")
@@ -185,69 +331,7 @@ def main():
         
         # Display todos
         for todo in todos:
-            todo_id = todo['id']
-            todo_text = todo['text']
-            completed = todo.get('completed', False)
-            
-            # Create columns for todo display
-            col1, col2, col3, col4 = st.columns([6, 1, 1, 1])
-            
-            with col1:
-                status_icon = "✅" if completed else "⏳"
-                status_class = "todo-completed" if completed else ""
-                st.markdown(f"""
-                    <div class="todo-item {status_class}">
-                        <strong>{status_icon} Todo #{todo_id}:</strong> {todo_text}
-                    </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                if not completed:
-                    if st.button("✓", key=f"complete_{todo_id}", help="Mark as complete"):
-                        if update_todo(todo_id, completed=True):
-                            st.success("Completed!")
-                            time.sleep(0.5)
-                            st.rerun()
-                else:
-                    if st.button("↩", key=f"uncomplete_{todo_id}", help="Mark as incomplete"):
-                        if update_todo(todo_id, completed=False):
-                            st.success("Marked as incomplete!")
-                            time.sleep(0.5)
-                            st.rerun()
-            
-            with col3:
-                if st.button("✏️", key=f"edit_{todo_id}", help="Edit"):
-                    st.session_state[f"editing_{todo_id}"] = True
-            
-            with col4:
-                if st.button("🗑️", key=f"delete_{todo_id}", help="Delete"):
-                    if delete_todo(todo_id):
-                        st.success("Deleted!")
-                        time.sleep(0.5)
-                        st.rerun()
-            
-            # Edit form
-            if st.session_state.get(f"editing_{todo_id}", False):
-                with st.form(key=f"edit_form_{todo_id}"):
-                    new_text = st.text_input("Edit todo", value=todo_text, key=f"edit_input_{todo_id}")
-                    col_submit, col_cancel = st.columns(2)
-                    with col_submit:
-                        submit_edit = st.form_submit_button("Save")
-                    with col_cancel:
-                        cancel_edit = st.form_submit_button("Cancel")
-                    
-                    if submit_edit and new_text:
-                        if update_todo(todo_id, text=new_text):
-                            st.session_state[f"editing_{todo_id}"] = False
-                            st.success("Updated!")
-                            time.sleep(0.5)
-                            st.rerun()
-                    
-                    if cancel_edit:
-                        st.session_state[f"editing_{todo_id}"] = False
-                        st.rerun()
-            
-            st.markdown("<br>", unsafe_allow_html=True)
+            render_todo(todo)
 
 if __name__ == "__main__":
     main()
@@ -1,113 +1,57 @@
 """
 LangGraph workflow for processing natural language todo commands using reactive tool calling
 """
-from typing import Annotated, TypedDict
-from langgraph.graph.message import add_messages
-from langchain_ollama import ChatOllama
-from langchain_core.tools import tool
-from langchain.agents import create_agent
-from langgraph.prebuilt import ToolNode
-from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
+from typing import Annotated, Optional, TypedDict
+from collections import OrderedDict
 import json
-import os
-from datetime import datetime
+import re
+import threading
+from todos_store import store
 
-# JSON database file - use absolute path based on script location
-DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "todos.json")
-
-# Define the state - simplified for reactive tool calling
-class TodoAgentState(TypedDict):
-    messages: Annotated[list, add_messages]
-
-# Database functions
-def load_todos():
-    """Load todos from JSON file"""
-    if os.path.exists(DB_FILE):
-        try:
-            with open(DB_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_todos(todos):
-    """Save todos to JSON file"""
-    with open(DB_FILE, 'w') as f:
-        json.dump(todos, f, indent=2)
-
-def get_next_id(todos):
-    """Get the next available ID"""
-    if not todos:
-        return 1
-    return max(todo.get('id', 0) for todo in todos) + 1
-
-# Tool functions for todo operations
-@tool
+# Tool functions for todo operations (wrapped with @tool lazily in create_todo_graph)
 def create_todo_tool(text: str) -> dict:
     """Create a new todo item with the given text."""
-    todos = load_todos()
-    new_todo = {
-        "id": get_next_id(todos),
-        "text": text,
-        "completed": False,
-        "created_at": datetime.now().isoformat()
-    }
-    todos.append(new_todo)
-    save_todos(todos)
+    new_todo = store.add(text)
     return {"success": True, "todo": new_todo, "message": f"Created todo: {text}"}
 
-@tool
 def delete_todo_tool(todo_id: int) -> dict:
     """Delete a todo item by its ID."""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    todo = store.delete(todo_id)
     if not todo:
         return {"success": False, "message": f"Todo with ID {todo_id} not found"}
     
-    todos = [t for t in todos if t['id'] != todo_id]
-    save_todos(todos)
     return {"success": True, "message": f"Deleted todo: {todo['text']}"}
 
-@tool
 def update_todo_tool(todo_id: int, new_text: str) -> dict:
     """Update the text of a todo item by its ID."""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    todo = store.get(todo_id)
     if not todo:
         return {"success": False, "message": f"Todo with ID {todo_id} not found"}
     
     old_text = todo['text']
-    todo['text'] = new_text
-    save_todos(todos)
+    store.update(todo_id, text=new_text)
     return {"success": True, "message": f"Updated todo {todo_id} from '{old_text}' to '{new_text}'"}
 
-@tool
 def complete_todo_tool(todo_id: int) -> dict:
     """Mark a todo item as completed by its ID."""
-    todos = load_todos()
-    todo = next((t for t in todos if t['id'] == todo_id), None)
+    todo = store.update(todo_id, completed=True)
     if not todo:
         return {"success": False, "message": f"Todo with ID {todo_id} not found"}
     
-    todo['completed'] = True
-    save_todos(todos)
     return {"success": True, "message": f"Marked todo as completed: {todo['text']}"}
 
-@tool
 def delete_all_todos_tool() -> dict:
     """Delete all todo items."""
-    save_todos([])
+    store.delete_all()
     return {"success": True, "message": "All todos deleted"}
 
-@tool
 def list_todos_tool() -> dict:
     """Get all todos."""
-    todos = load_todos()
+    todos = store.all()
     return {"success": True, "todos": todos, "count": len(todos)}
 
-# Initialize tools
-tools = [
+# Tool functions exposed to the agent
+tool_functions = [
     create_todo_tool,
     delete_todo_tool,
     update_todo_tool,
@@ -116,27 +60,102 @@ tools = [
     list_todos_tool
 ]
 
-# Initialize LLM
-llm = ChatOllama(model="llama3.2:latest")
+# LangChain/LangGraph objects are heavy to import and construct, so they are
+# only created by create_todo_graph on the first natural language command
+TodoAgentState = None
+llm = None
+agent = None
+
+def create_state_schema():
+    """Define the state - simplified for reactive tool calling"""
+    from langgraph.graph.message import add_messages
+
+    class TodoAgentState(TypedDict):
+        messages: Annotated[list, add_messages]
+        # Result of the most recent tool call in the current command
+        last_tool_result: Optional[dict]
+
+    return TodoAgentState
+
+# Maximum number of conversation threads kept in the checkpointer's memory
+MAX_THREADS = 1024
+
+def create_checkpointer():
+    """Create an in-memory checkpointer that only keeps the most recently used threads"""
+    from langgraph.checkpoint.memory import MemorySaver
+
+    class BoundedMemorySaver(MemorySaver):
+        """MemorySaver that evicts the least recently used thread beyond max_threads"""
 
-# Create the ReAct agent with the LLM and tools (handles reactive tool calling)
-agent = create_agent(llm, tools)
+        def __init__(self, max_threads: int):
+            super().__init__()
+            self.max_threads = max_threads
+            self.thread_order = OrderedDict()
+            self.thread_lock = threading.Lock()
 
-# Use ToolNode for automatic tool execution
-tool_node = ToolNode(tools)
+        def touch(self, config):
+            """Mark a thread as recently used and evict the oldest threads"""
+            thread_id = config.get("configurable", {}).get("thread_id")
+            if thread_id is None:
+                return
+            with self.thread_lock:
+                self.thread_order[thread_id] = None
+                self.thread_order.move_to_end(thread_id)
+                while len(self.thread_order) > self.max_threads:
+                    oldest, _ = self.thread_order.popitem(last=False)
+                    self.delete_thread(oldest)
+
+        def get_tuple(self, config):
+            self.touch(config)
+            return super().get_tuple(config)
+
+        def put(self, config, checkpoint, metadata, new_versions):
+            self.touch(config)
+            return super().put(config, checkpoint, metadata, new_versions)
+
+    return BoundedMemorySaver(MAX_THREADS)
+
+def parse_tool_message(msg) -> Optional[dict]:
+    """Convert a ToolMessage into a result dict, keeping the tool name so
+    callers don't have to infer the action from the message"""
+    # ToolMessage content contains the tool result
+    tool_result = msg.content
+    
+    # Tool results are typically dicts (from our tool functions)
+    if isinstance(tool_result, dict):
+        return {**tool_result, "tool": msg.name}
+    elif isinstance(tool_result, str):
+        # Try to parse JSON string
+        try:
+            parsed = json.loads(tool_result)
+            if isinstance(parsed, dict):
+                return {**parsed, "tool": msg.name}
+        except:
+            return {"success": True, "message": tool_result, "tool": msg.name}
+    return None
+
+def latest_tool_result(messages) -> Optional[dict]:
+    """Get the result of the most recent tool call in messages"""
+    from langchain_core.messages import ToolMessage
+    
+    for msg in reversed(messages):
+        if isinstance(msg, ToolMessage):
+            result = parse_tool_message(msg)
+            if result is not None:
+                return result
+    return None
 
 # Agent node - calls LLM which can decide to use tools
-def call_agent(state: TodoAgentState) -> TodoAgentState:
+def call_agent(state: "TodoAgentState") -> "TodoAgentState":
     """Agent node that processes user command and decides to call tools"""
     messages = state["messages"]
     
-    # Get current todos for context
-    todos = load_todos()
-    todos_context = "\n".join([f"ID {t['id']}: {t['text']} ({'completed' if t.get('completed') else 'pending'})" 
-                               for t in todos])
-    
-    # Add system context if this is the first message
-    if len(messages) == 1 and todos:
+    # Add system context if this is the first message; later turns in the
+    # tool-calling loop rely on the tool results for fresh todos
+    todos = store.all() if len(messages) == 1 else None
+    if todos:
+        todos_context = "\n".join([f"ID {t['id']}: {t['text']} ({'completed' if t.get('completed') else 'pending'})" 
+                                   for t in todos])
         system_msg = f"""You are a helpful todo assistant. Current todos:
 {todos_context}
 
@@ -151,10 +170,30 @@ Always use the appropriate tool to perform actions."""
     # Extract new messages from result (agent may have added tool calls and responses)
     new_messages = result.get("messages", [])
     
+    # The agent runs its own tool loop, so record any tool result it produced
+    tool_result = latest_tool_result(new_messages[len(messages):])
+    if tool_result is not None:
+        return {"messages": new_messages, "last_tool_result": tool_result}
     return {"messages": new_messages}
 
+# Capture node - records the result of the tools node in state
+def capture_tool_result(state: "TodoAgentState") -> dict:
+    """Copy the newest tool result into state so it can be read without scanning messages"""
+    from langchain_core.messages import ToolMessage
+    
+    # Only look at the ToolMessages the tools node just added
+    tool_messages = []
+    for msg in reversed(state["messages"]):
+        if not isinstance(msg, ToolMessage):
+            break
+        tool_messages.append(msg)
+    tool_result = latest_tool_result(tool_messages[::-1])
+    if tool_result is not None:
+        return {"last_tool_result": tool_result}
+    return {}
+
 # Conditional edge function - check if agent wants to call tools
-def should_continue(state: TodoAgentState) -> str:
+def should_continue(state: "TodoAgentState") -> str:
     """Check if the agent wants to call tools or is done"""
     last_message = state["messages"][-1]
     
@@ -168,11 +207,33 @@ def should_continue(state: TodoAgentState) -> str:
 # Build the graph with reactive tool calling
 def create_todo_graph():
     """Create and compile the todo command processing graph with reactive tool calling"""
+    from langchain_ollama import ChatOllama
+    from langchain_core.tools import tool
+    from langchain.agents import create_agent
+    from langgraph.prebuilt import ToolNode
+    from langgraph.graph import StateGraph, START, END
+    global TodoAgentState, llm, agent
+
+    TodoAgentState = create_state_schema()
+
+    # Initialize tools
+    tools = [tool(f) for f in tool_functions]
+
+    # Initialize LLM
+    llm = ChatOllama(model="llama3.2:latest")
+
+    # Create the ReAct agent with the LLM and tools (handles reactive tool calling)
+    agent = create_agent(llm, tools)
+
+    # Use ToolNode for automatic tool execution
+    tool_node = ToolNode(tools)
+
     workflow = StateGraph(TodoAgentState)
     
     # Add nodes
     workflow.add_node("agent", call_agent)  # LLM agent node
     workflow.add_node("tools", tool_node)   # Automatic tool execution node
+    workflow.add_node("capture", capture_tool_result)  # Records the tool result
     
     # Set entry point
     workflow.add_edge(START, "agent")
@@ -187,11 +248,12 @@ def create_todo_graph():
         }
     )
     
-    # After tools execute, loop back to agent to process results
-    workflow.add_edge("tools", "agent")
+    # After tools execute, record the result and loop back to agent
+    workflow.add_edge("tools", "capture")
+    workflow.add_edge("capture", "agent")
     
     # Add memory
-    memory = MemorySaver()
+    memory = create_checkpointer()
     
     # Compile the graph
     app = workflow.compile(checkpointer=memory)
@@ -200,56 +262,86 @@ def create_todo_graph():
 
 # Global graph instance
 _todo_graph = None
+_todo_graph_lock = threading.Lock()
 
 def get_todo_graph():
     """Get or create the todo graph instance"""
     global _todo_graph
-    if _todo_graph is None:
-        _todo_graph = create_todo_graph()
+    with _todo_graph_lock:
+        if _todo_graph is None:
+            _todo_graph = create_todo_graph()
     return _todo_graph
 
+def warmup():
+    """Build the graph and have Ollama load the model with a one-token prompt"""
+    get_todo_graph()
+    llm.invoke("ping", options={"num_predict": 1})
+
+# Commands that only read todos (e.g. "list todos", "show my todos")
+READ_ONLY_COMMAND = re.compile(
+    r"^\s*(list|show|view|display|get)\b"
+    r"(?!.*\b(add|create|delete|remove|complete|finish|edit|update|rename|mark)\b)",
+    re.IGNORECASE
+)
+
+# Results of read-only commands keyed by (command, thread_id, todos version),
+# with the least recently used dropped beyond READ_ONLY_CACHE_SIZE
+READ_ONLY_CACHE_SIZE = 128
+_read_only_results = OrderedDict()
+_read_only_lock = threading.Lock()
+
 def process_command_with_graph(command: str, thread_id: str = "default") -> dict:
-    """Process a natural language command using LangGraph with reactive tool calling"""
-    from langchain_core.messages import ToolMessage
+    """Process a natural language command, reusing results of repeated read-only commands"""
+    if not READ_ONLY_COMMAND.match(command):
+        return run_command_graph(command, thread_id)
+    
+    # The store version is part of the key, so any change to todos
+    # (including edits to the file on disk) invalidates the cached result
+    store.load()
+    key = (command, thread_id, store.version)
+    with _read_only_lock:
+        if key in _read_only_results:
+            _read_only_results.move_to_end(key)
+            return dict(_read_only_results[key])
     
+    result = run_command_graph(command, thread_id)
+    
+    # Only cache results that came from listing the todos, not free-text replies
+    if result.get("tool") == "list_todos_tool":
+        with _read_only_lock:
+            _read_only_results[key] = dict(result)
+            while len(_read_only_results) > READ_ONLY_CACHE_SIZE:
+                _read_only_results.popitem(last=False)
+    return result
+
+def run_command_graph(command: str, thread_id: str = "default") -> dict:
+    """Process a natural language command using LangGraph with reactive tool calling"""
     graph = get_todo_graph()
     
-    # Create initial state with user message
+    # Create initial state with user message, clearing the previous command's
+    # tool result from the thread's checkpoint
     initial_state = {
-        "messages": [("user", command)]
+        "messages": [("user", command)],
+        "last_tool_result": None
     }
     
     # Configuration with thread_id for memory
     config = {"configurable": {"thread_id": thread_id}}
     
-    # Run the graph - it will reactively call tools as needed
-    final_state = graph.invoke(initial_state, config)
+    # Run the graph - it will reactively call tools as needed; all tool
+    # changes made during this command are written to disk once at the end
+    try:
+        final_state = graph.invoke(initial_state, config)
+    finally:
+        store.flush()
     
-    # Extract result from tool messages or final agent response
-    result = {"success": False, "message": "No result"}
+    # Use the tool result captured by the graph
+    result = final_state.get("last_tool_result") or {"success": False, "message": "No result"}
     
-    # Look for ToolMessage objects (results from tool execution)
-    for msg in reversed(final_state["messages"]):
-        # Check if this is a ToolMessage (result from tool execution)
-        if isinstance(msg, ToolMessage):
-            # ToolMessage content contains the tool result
-            tool_result = msg.content
-            
-            # Tool results are typically dicts (from our tool functions)
-            if isinstance(tool_result, dict):
-                result = tool_result
-                break
-            elif isinstance(tool_result, str):
-                # Try to parse JSON string
-                try:
-                    import json
-                    parsed = json.loads(tool_result)
-                    if isinstance(parsed, dict):
-                        result = parsed
-                        break
-                except:
-                    result = {"success": True, "message": tool_result}
-                    break
+    # Attach the todo list after a change here rather than in the tool output,
+    # which the LLM reads and the checkpointer keeps in the thread history
+    if result.get("tool") and "todos" not in result:
+        result["todos"] = store.all()
     
     # If no tool result found, use the final agent response
     if not result.get("success"):
@@ -0,0 +1,189 @@
+"""
+JSON file storage for todos, shared by the FastAPI backend and the LangGraph tools
+"""
+from typing import Dict, List, Optional, Tuple
+import orjson
+import os
+import re
+import threading
+from datetime import datetime
+
+# JSON database file - use absolute path based on script location
+DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "todos.json")
+
+# The "completed" value of each todo in the JSON file, including any padding
+# spaces reserved so "true" can be overwritten with "false" in place
+COMPLETED_VALUE = re.compile(rb'"completed": ((?:true|false) *)')
+
+class Store:
+    """In-memory todos keyed by ID, backed by a JSON file.
+
+    The file is only re-read when it changes on disk, and changes are only
+    written when flush() is called, so several mutations cost a single write.
+    When the only changes are to "completed" flags, flush() overwrites those
+    values in place instead of rewriting the whole file.
+    """
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self._todos: Optional[Dict[int, dict]] = None
+        self._mtime: Optional[int] = None
+        self._next_id = 1
+        # Set when the cache has changes that haven't been written to disk yet
+        self._dirty = False
+        # Set when pending changes need the whole file to be rewritten
+        self._rewrite = False
+        # Pending in-place "completed" updates, and each todo's value offset
+        # and length in the file
+        self._completed_patches: Dict[int, bool] = {}
+        self._completed_offsets: Dict[int, Tuple[int, int]] = {}
+        # Bumped on every change, so callers can tell when todos differ
+        self.version = 0
+        self._lock = threading.RLock()
+
+    def _db_mtime(self) -> Optional[int]:
+        """Get the modification time of the JSON file, or None if it doesn't exist"""
+        try:
+            return os.stat(self.db_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self) -> Dict[int, dict]:
+        """Load todos from the cache, reading the JSON file only if it changed"""
+        with self._lock:
+            mtime = self._db_mtime()
+            if self._todos is not None and (self._dirty or mtime == self._mtime):
+                return self._todos
+            todos = {}
+            data = b""
+            if mtime is not None:
+                try:
+                    with open(self.db_file, 'rb') as f:
+                        data = f.read()
+                    todos = {t['id']: t for t in orjson.loads(data)}
+                except:
+                    todos = {}
+            self._todos = todos
+            self._index_completed_offsets(data)
+            self._mtime = mtime
+            self._next_id = max(todos, default=0) + 1
+            self.version += 1
+            return todos
+
+    def all(self) -> List[dict]:
+        """Get all todos"""
+        return list(self.load().values())
+
+    def get(self, todo_id: int) -> Optional[dict]:
+        """Get a todo by ID, or None if it doesn't exist"""
+        return self.load().get(todo_id)
+
+    def add(self, text: str) -> dict:
+        """Create a new todo with the given text"""
+        with self._lock:
+            todos = self.load()
+            new_todo = {
+                "id": self._next_id,
+                "text": text,
+                "completed": False,
+                "created_at": datetime.now().isoformat()
+            }
+            self._next_id += 1
+            todos[new_todo["id"]] = new_todo
+            self._changed()
+            return new_todo
+
+    def update(self, todo_id: int, **fields) -> Optional[dict]:
+        """Update fields of a todo, returning it or None if it doesn't exist"""
+        with self._lock:
+            todo = self.load().get(todo_id)
+            if todo is None:
+                return None
+            todo.update(fields)
+            if fields.keys() == {"completed"} and self._can_patch(todo_id, fields["completed"]):
+                self._completed_patches[todo_id] = fields["completed"]
+                self._changed(rewrite=False)
+            else:
+                self._changed()
+            return todo
+
+    def delete(self, todo_id: int) -> Optional[dict]:
+        """Delete a todo, returning it or None if it doesn't exist"""
+        with self._lock:
+            todo = self.load().pop(todo_id, None)
+            if todo is not None:
+                self._changed()
+            return todo
+
+    def delete_all(self):
+        """Delete all todos"""
+        with self._lock:
+            self.load().clear()
+            self._changed()
+
+    def _changed(self, rewrite: bool = True):
+        """Record a change to the cached todos"""
+        self._dirty = True
+        self._rewrite = self._rewrite or rewrite
+        self.version += 1
+
+    def _can_patch(self, todo_id: int, completed: bool) -> bool:
+        """Check if a todo's "completed" value can be overwritten in place"""
+        if self._rewrite or not hasattr(os, "pwrite"):
+            return False
+        slot = self._completed_offsets.get(todo_id)
+        return slot is not None and len(orjson.dumps(completed)) <= slot[1]
+
+    def _index_completed_offsets(self, data: bytes):
+        """Find each todo's "completed" value in the file contents"""
+        self._completed_offsets = {}
+        todos = self._todos.values()
+        if not all("completed" in todo for todo in todos):
+            return
+        matches = list(COMPLETED_VALUE.finditer(data))
+        if len(matches) != len(todos):
+            return
+        self._completed_offsets = {
+            todo["id"]: (match.start(1), len(match.group(1)))
+            for todo, match in zip(todos, matches)
+        }
+
+    def _write_completed_patches(self):
+        """Overwrite pending "completed" values in the file without rewriting it"""
+        fd = os.open(self.db_file, os.O_WRONLY)
+        try:
+            for todo_id, completed in self._completed_patches.items():
+                offset, length = self._completed_offsets[todo_id]
+                os.pwrite(fd, orjson.dumps(completed).ljust(length), offset)
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        """Write pending changes to the JSON file, coalescing any number of changes into one write"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # Only patch the file if it is still the one the offsets came from
+            if not self._rewrite and self._db_mtime() == self._mtime:
+                try:
+                    self._write_completed_patches()
+                except OSError:
+                    self._rewrite = True
+            else:
+                self._rewrite = True
+            if self._rewrite:
+                # Pad "true" so it can later be overwritten with "false" in place
+                data = orjson.dumps(list(self._todos.values()), option=orjson.OPT_INDENT_2)
+                data = data.replace(b'"completed": true', b'"completed": true ')
+                tmp_file = self.db_file + ".tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_file, self.db_file)
+                self._index_completed_offsets(data)
+            self._mtime = self._db_mtime()
+            self._dirty = False
+            self._rewrite = False
+            self._completed_patches = {}
+
+# Shared store instance
+store = Store(DB_FILE)